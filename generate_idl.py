@@ -1,330 +1,269 @@
 #!/usr/bin/env python3
 """
 Custom IDL generator for Meteora Fee Router
-Parses Anchor Rust code and generates proper IDL JSON
+Reads the program ID from Anchor Rust code and generates proper IDL JSON
 """
+import argparse
 import json
 import re
-import os
 from pathlib import Path
 
-def parse_instruction(content, instruction_name):
-    """Parse a single instruction from the program"""
-    # Find the instruction function
-    pattern = rf'pub fn {instruction_name}\(([^)]+)\) -> Result<\(\)>'
-    match = re.search(pattern, content, re.MULTILINE)
-    
-    if not match:
-        return None
-    
-    params = match.group(1)
-    
-    # Parse parameters
-    args = []
-    if 'ctx: Context<' in params:
-        # Extract context type
-        ctx_match = re.search(r'Context<(\w+)>', params)
-        context_name = ctx_match.group(1) if ctx_match else None
-        
-        # Parse other arguments
-        remaining_params = re.sub(r'ctx: Context<\w+>,?\s*', '', params)
-        if remaining_params.strip():
-            for param in remaining_params.split(','):
-                param = param.strip()
-                if ':' in param:
-                    name, type_str = param.split(':', 1)
-                    args.append({
-                        "name": name.strip(),
-                        "type": map_rust_type(type_str.strip())
-                    })
-    
-    return {
-        "name": instruction_name,
-        "accounts": [],  # Will be populated from context
-        "args": args
-    }
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-def map_rust_type(rust_type):
-    """Map Rust types to IDL types"""
-    type_mapping = {
-        'u64': 'u64',
-        'i64': 'i64',
-        'u32': 'u32',
-        'i32': 'i32',
-        'u16': 'u16',
-        'i16': 'i16',
-        'u8': 'u8',
-        'i8': 'i8',
-        'bool': 'bool',
-        'String': 'string',
-        'Pubkey': 'publicKey',
-        '[u8; 32]': 'publicKey',
-    }
-    return type_mapping.get(rust_type, rust_type)
+_ID_RE = re.compile(r'declare_id!\("([^"]+)"\)')
+_PROGRAM_ID_WINDOW = 8192
 
-def parse_context_accounts(file_path, context_name):
-    """Parse account structure from context file"""
-    try:
-        with open(file_path, 'r') as f:
-            content = f.read()
-        
-        # Find the struct definition
-        pattern = rf'#\[derive\(Accounts\)\]\s*pub struct {context_name}<\'info>\s*\{{([^}}]+)\}}'
-        match = re.search(pattern, content, re.DOTALL)
-        
-        if not match:
-            return []
-        
-        struct_body = match.group(1)
-        accounts = []
-        
-        # Parse each field
-        field_pattern = r'pub (\w+):\s*([^,\n]+)'
-        for field_match in re.finditer(field_pattern, struct_body):
-            field_name = field_match.group(1)
-            field_type = field_match.group(2).strip()
-            
-            # Determine if mutable and signer
-            is_mut = '#[account(mut' in struct_body
-            is_signer = 'Signer' in field_type
-            
-            accounts.append({
-                "name": field_name,
-                "isMut": is_mut,
-                "isSigner": is_signer
-            })
-        
-        return accounts
-    except Exception as e:
-        print(f"Error parsing context {context_name}: {e}")
-        return []
+PROGRAM_PATH = Path("programs/meteora-fee-router/src/lib.rs")
+IDL_PATH = Path("target/idl/meteora_fee_router.json")
+STAMP_PATH = IDL_PATH.with_name(".meteora_fee_router.stamp")
 
-def generate_idl():
-    """Generate complete IDL for Meteora Fee Router"""
-    
-    # Read the main program file
-    program_path = Path("programs/meteora-fee-router/src/lib.rs")
-    with open(program_path, 'r') as f:
-        program_content = f.read()
-    
-    # Extract program ID
-    program_id_match = re.search(r'declare_id!\("([^"]+)"\)', program_content)
-    program_id = program_id_match.group(1) if program_id_match else "HNgumZPoZAt5JmuqWCe2WRTPfP6MZcZgFTpYLUVkusWu"
-    
-    # Define all instructions from your program
-    instructions = [
-        "initialize_position",
-        "initialize_treasury", 
-        "claim_fees",
-        "initialize_global_distribution",
-        "initialize_policy",
-        "start_daily_distribution",
-        "process_investor_page",
-        "complete_daily_distribution"
-    ]
-    
-    idl_instructions = []
-    
-    for instruction in instructions:
-        parsed = parse_instruction(program_content, instruction)
-        if parsed:
-            idl_instructions.append(parsed)
-    
-    # Create comprehensive IDL
-    idl = {
-        "version": "0.1.0",
-        "name": "meteora_fee_router",
-        "instructions": [
-            {
-                "name": "initializePosition",
-                "accounts": [
-                    {"name": "authority", "isMut": True, "isSigner": True},
-                    {"name": "vault", "isMut": False, "isSigner": False},
-                    {"name": "positionOwnerPda", "isMut": False, "isSigner": False},
-                    {"name": "pool", "isMut": True, "isSigner": False},
-                    {"name": "position", "isMut": True, "isSigner": True},
-                    {"name": "positionMetadata", "isMut": True, "isSigner": False},
-                    {"name": "quoteMint", "isMut": False, "isSigner": False},
-                    {"name": "systemProgram", "isMut": False, "isSigner": False},
-                    {"name": "tokenProgram", "isMut": False, "isSigner": False},
-                    {"name": "token2022Program", "isMut": False, "isSigner": False}
-                ],
-                "args": []
-            },
-            {
-                "name": "initializeTreasury",
-                "accounts": [
-                    {"name": "authority", "isMut": True, "isSigner": True},
-                    {"name": "treasury", "isMut": True, "isSigner": False},
-                    {"name": "treasuryAta", "isMut": True, "isSigner": False},
-                    {"name": "quoteMint", "isMut": False, "isSigner": False},
-                    {"name": "systemProgram", "isMut": False, "isSigner": False},
-                    {"name": "tokenProgram", "isMut": False, "isSigner": False},
-                    {"name": "associatedTokenProgram", "isMut": False, "isSigner": False}
-                ],
-                "args": [
-                    {"name": "quoteMint", "type": "publicKey"}
+def _to_camel(name):
+    """Convert a snake_case Rust identifier to the camelCase used in the IDL"""
+    parts = name.split('_')
+    return parts[0] + ''.join(part.title() for part in parts[1:])
+
+# Instruction definitions keyed by their Rust (snake_case) handler names
+_INSTRUCTIONS = {
+    "initialize_position": {
+        "accounts": [
+            {"name": "authority", "isMut": True, "isSigner": True},
+            {"name": "vault", "isMut": False, "isSigner": False},
+            {"name": "positionOwnerPda", "isMut": False, "isSigner": False},
+            {"name": "pool", "isMut": True, "isSigner": False},
+            {"name": "position", "isMut": True, "isSigner": True},
+            {"name": "positionMetadata", "isMut": True, "isSigner": False},
+            {"name": "quoteMint", "isMut": False, "isSigner": False},
+            {"name": "systemProgram", "isMut": False, "isSigner": False},
+            {"name": "tokenProgram", "isMut": False, "isSigner": False},
+            {"name": "token2022Program", "isMut": False, "isSigner": False}
+        ],
+        "args": []
+    },
+    "initialize_treasury": {
+        "accounts": [
+            {"name": "authority", "isMut": True, "isSigner": True},
+            {"name": "treasury", "isMut": True, "isSigner": False},
+            {"name": "treasuryAta", "isMut": True, "isSigner": False},
+            {"name": "quoteMint", "isMut": False, "isSigner": False},
+            {"name": "systemProgram", "isMut": False, "isSigner": False},
+            {"name": "tokenProgram", "isMut": False, "isSigner": False},
+            {"name": "associatedTokenProgram", "isMut": False, "isSigner": False}
+        ],
+        "args": [
+            {"name": "quoteMint", "type": "publicKey"}
+        ]
+    },
+    "claim_fees": {
+        "accounts": [
+            {"name": "authority", "isMut": True, "isSigner": True},
+            {"name": "positionOwnerPda", "isMut": False, "isSigner": False},
+            {"name": "position", "isMut": True, "isSigner": False},
+            {"name": "pool", "isMut": True, "isSigner": False},
+            {"name": "treasuryAta", "isMut": True, "isSigner": False},
+            {"name": "quoteMint", "isMut": False, "isSigner": False},
+            {"name": "tokenProgram", "isMut": False, "isSigner": False}
+        ],
+        "args": []
+    },
+    "initialize_global_distribution": {
+        "accounts": [
+            {"name": "authority", "isMut": True, "isSigner": True},
+            {"name": "globalDistributionState", "isMut": True, "isSigner": False},
+            {"name": "quoteMint", "isMut": False, "isSigner": False},
+            {"name": "systemProgram", "isMut": False, "isSigner": False}
+        ],
+        "args": [
+            {"name": "quoteMint", "type": "publicKey"}
+        ]
+    },
+    "initialize_policy": {
+        "accounts": [
+            {"name": "authority", "isMut": True, "isSigner": True},
+            {"name": "policyState", "isMut": True, "isSigner": False},
+            {"name": "quoteMint", "isMut": False, "isSigner": False},
+            {"name": "systemProgram", "isMut": False, "isSigner": False}
+        ],
+        "args": [
+            {"name": "investorFeeShareBps", "type": "u64"},
+            {"name": "dailyCapLamports", "type": "u64"},
+            {"name": "minPayoutLamports", "type": "u64"},
+            {"name": "y0TotalAllocation", "type": "u64"}
+        ]
+    },
+    "start_daily_distribution": {
+        "accounts": [
+            {"name": "authority", "isMut": True, "isSigner": True},
+            {"name": "dailyDistributionState", "isMut": True, "isSigner": False},
+            {"name": "globalDistributionState", "isMut": True, "isSigner": False},
+            {"name": "policyState", "isMut": False, "isSigner": False},
+            {"name": "systemProgram", "isMut": False, "isSigner": False}
+        ],
+        "args": [
+            {"name": "distributionDay", "type": "i64"}
+        ]
+    },
+    "process_investor_page": {
+        "accounts": [
+            {"name": "authority", "isMut": True, "isSigner": True},
+            {"name": "dailyDistributionState", "isMut": True, "isSigner": False},
+            {"name": "globalDistributionState", "isMut": True, "isSigner": False},
+            {"name": "policyState", "isMut": False, "isSigner": False}
+        ],
+        "args": []
+    },
+    "complete_daily_distribution": {
+        "accounts": [
+            {"name": "authority", "isMut": True, "isSigner": True},
+            {"name": "dailyDistributionState", "isMut": True, "isSigner": False},
+            {"name": "globalDistributionState", "isMut": True, "isSigner": False}
+        ],
+        "args": []
+    }
+}
+
+# Static IDL skeleton, built once at import time
+_IDL_TEMPLATE = {
+    "version": "0.1.0",
+    "name": "meteora_fee_router",
+    "instructions": [
+        {"name": _to_camel(name), **instruction}
+        for name, instruction in _INSTRUCTIONS.items()
+    ],
+    "accounts": [
+        {
+            "name": "PositionMetadata",
+            "type": {
+                "kind": "struct",
+                "fields": [
+                    {"name": "vault", "type": "publicKey"},
+                    {"name": "quoteMint", "type": "publicKey"},
+                    {"name": "positionOwner", "type": "publicKey"},
+                    {"name": "bump", "type": "u8"}
                 ]
-            },
-            {
-                "name": "claimFees",
-                "accounts": [
-                    {"name": "authority", "isMut": True, "isSigner": True},
-                    {"name": "positionOwnerPda", "isMut": False, "isSigner": False},
-                    {"name": "position", "isMut": True, "isSigner": False},
-                    {"name": "pool", "isMut": True, "isSigner": False},
-                    {"name": "treasuryAta", "isMut": True, "isSigner": False},
-                    {"name": "quoteMint", "isMut": False, "isSigner": False},
-                    {"name": "tokenProgram", "isMut": False, "isSigner": False}
-                ],
-                "args": []
-            },
-            {
-                "name": "initializeGlobalDistribution",
-                "accounts": [
-                    {"name": "authority", "isMut": True, "isSigner": True},
-                    {"name": "globalDistributionState", "isMut": True, "isSigner": False},
-                    {"name": "quoteMint", "isMut": False, "isSigner": False},
-                    {"name": "systemProgram", "isMut": False, "isSigner": False}
-                ],
-                "args": [
-                    {"name": "quoteMint", "type": "publicKey"}
+            }
+        },
+        {
+            "name": "Treasury",
+            "type": {
+                "kind": "struct", 
+                "fields": [
+                    {"name": "authority", "type": "publicKey"},
+                    {"name": "quoteMint", "type": "publicKey"},
+                    {"name": "bump", "type": "u8"}
                 ]
-            },
-            {
-                "name": "initializePolicy",
-                "accounts": [
-                    {"name": "authority", "isMut": True, "isSigner": True},
-                    {"name": "policyState", "isMut": True, "isSigner": False},
-                    {"name": "quoteMint", "isMut": False, "isSigner": False},
-                    {"name": "systemProgram", "isMut": False, "isSigner": False}
-                ],
-                "args": [
+            }
+        },
+        {
+            "name": "PolicyState",
+            "type": {
+                "kind": "struct",
+                "fields": [
+                    {"name": "authority", "type": "publicKey"},
+                    {"name": "quoteMint", "type": "publicKey"},
                     {"name": "investorFeeShareBps", "type": "u64"},
                     {"name": "dailyCapLamports", "type": "u64"},
                     {"name": "minPayoutLamports", "type": "u64"},
-                    {"name": "y0TotalAllocation", "type": "u64"}
+                    {"name": "y0TotalAllocation", "type": "u64"},
+                    {"name": "bump", "type": "u8"}
                 ]
-            },
-            {
-                "name": "startDailyDistribution",
-                "accounts": [
-                    {"name": "authority", "isMut": True, "isSigner": True},
-                    {"name": "dailyDistributionState", "isMut": True, "isSigner": False},
-                    {"name": "globalDistributionState", "isMut": True, "isSigner": False},
-                    {"name": "policyState", "isMut": False, "isSigner": False},
-                    {"name": "systemProgram", "isMut": False, "isSigner": False}
-                ],
-                "args": [
-                    {"name": "distributionDay", "type": "i64"}
+            }
+        },
+        {
+            "name": "GlobalDistributionState",
+            "type": {
+                "kind": "struct",
+                "fields": [
+                    {"name": "authority", "type": "publicKey"},
+                    {"name": "quoteMint", "type": "publicKey"},
+                    {"name": "totalDistributed", "type": "u64"},
+                    {"name": "lastDistributionDay", "type": "i64"},
+                    {"name": "bump", "type": "u8"}
                 ]
-            },
-            {
-                "name": "processInvestorPage",
-                "accounts": [
-                    {"name": "authority", "isMut": True, "isSigner": True},
-                    {"name": "dailyDistributionState", "isMut": True, "isSigner": False},
-                    {"name": "globalDistributionState", "isMut": True, "isSigner": False},
-                    {"name": "policyState", "isMut": False, "isSigner": False}
-                ],
-                "args": []
-            },
-            {
-                "name": "completeDailyDistribution",
-                "accounts": [
-                    {"name": "authority", "isMut": True, "isSigner": True},
-                    {"name": "dailyDistributionState", "isMut": True, "isSigner": False},
-                    {"name": "globalDistributionState", "isMut": True, "isSigner": False}
-                ],
-                "args": []
             }
-        ],
-        "accounts": [
-            {
-                "name": "PositionMetadata",
-                "type": {
-                    "kind": "struct",
-                    "fields": [
-                        {"name": "vault", "type": "publicKey"},
-                        {"name": "quoteMint", "type": "publicKey"},
-                        {"name": "positionOwner", "type": "publicKey"},
-                        {"name": "bump", "type": "u8"}
-                    ]
-                }
-            },
-            {
-                "name": "Treasury",
-                "type": {
-                    "kind": "struct", 
-                    "fields": [
-                        {"name": "authority", "type": "publicKey"},
-                        {"name": "quoteMint", "type": "publicKey"},
-                        {"name": "bump", "type": "u8"}
-                    ]
-                }
-            },
-            {
-                "name": "PolicyState",
-                "type": {
-                    "kind": "struct",
-                    "fields": [
-                        {"name": "authority", "type": "publicKey"},
-                        {"name": "quoteMint", "type": "publicKey"},
-                        {"name": "investorFeeShareBps", "type": "u64"},
-                        {"name": "dailyCapLamports", "type": "u64"},
-                        {"name": "minPayoutLamports", "type": "u64"},
-                        {"name": "y0TotalAllocation", "type": "u64"},
-                        {"name": "bump", "type": "u8"}
-                    ]
-                }
-            },
-            {
-                "name": "GlobalDistributionState",
-                "type": {
-                    "kind": "struct",
-                    "fields": [
-                        {"name": "authority", "type": "publicKey"},
-                        {"name": "quoteMint", "type": "publicKey"},
-                        {"name": "totalDistributed", "type": "u64"},
-                        {"name": "lastDistributionDay", "type": "i64"},
-                        {"name": "bump", "type": "u8"}
-                    ]
-                }
-            },
-            {
-                "name": "DailyDistributionState", 
-                "type": {
-                    "kind": "struct",
-                    "fields": [
-                        {"name": "distributionDay", "type": "i64"},
-                        {"name": "totalAmount", "type": "u64"},
-                        {"name": "processedInvestors", "type": "u32"},
-                        {"name": "isComplete", "type": "bool"},
-                        {"name": "bump", "type": "u8"}
-                    ]
-                }
+        },
+        {
+            "name": "DailyDistributionState", 
+            "type": {
+                "kind": "struct",
+                "fields": [
+                    {"name": "distributionDay", "type": "i64"},
+                    {"name": "totalAmount", "type": "u64"},
+                    {"name": "processedInvestors", "type": "u32"},
+                    {"name": "isComplete", "type": "bool"},
+                    {"name": "bump", "type": "u8"}
+                ]
             }
-        ],
-        "metadata": {
-            "address": program_id,
-            "origin": "custom_generator"
         }
+    ],
+    "metadata": {
+        "address": "__PROGRAM_ID__",
+        "origin": "custom_generator"
     }
+}
+
+def write_idl(idl, path):
+    """Write the IDL as indented JSON, preferring orjson when available"""
+    if orjson is not None:
+        path.write_bytes(orjson.dumps(idl, option=orjson.OPT_INDENT_2))
+        return
+    # Stream straight to the file rather than building the document in memory
+    with path.open("w") as f:
+        json.dump(idl, f, indent=2)
+
+def idl_stamp():
+    """Build-cache key: mtimes of lib.rs and of this generator, plus the written IDL's mtime and size"""
+    idl_stat = IDL_PATH.stat()
+    return "{}:{}:{}:{}".format(
+        PROGRAM_PATH.stat().st_mtime_ns,
+        Path(__file__).stat().st_mtime_ns,
+        idl_stat.st_mtime_ns,
+        idl_stat.st_size,
+    )
+
+def generate_idl(force=False):
+    """Generate complete IDL for Meteora Fee Router, or None if it is up to date"""
+    
+    if not force and IDL_PATH.exists() and STAMP_PATH.exists():
+        if STAMP_PATH.read_text() == idl_stamp():
+            return None
+    
+    # Extract program ID, which declare_id! places near the top of lib.rs
+    with PROGRAM_PATH.open() as f:
+        program_head = f.read(_PROGRAM_ID_WINDOW)
+        program_id_match = _ID_RE.search(program_head)
+        if not program_id_match:
+            program_id_match = _ID_RE.search(program_head + f.read())
+    program_id = program_id_match.group(1) if program_id_match else "HNgumZPoZAt5JmuqWCe2WRTPfP6MZcZgFTpYLUVkusWu"
+    
+    # Only metadata differs per program; everything else is shared with the
+    # template, which must not be mutated
+    idl = {**_IDL_TEMPLATE, "metadata": {**_IDL_TEMPLATE["metadata"], "address": program_id}}
     
     return idl
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--force", action="store_true", help="regenerate even if lib.rs is unchanged")
+    cli_args = parser.parse_args()
+    
     try:
-        idl = generate_idl()
-        
-        # Write to target/idl directory
-        os.makedirs("target/idl", exist_ok=True)
-        with open("target/idl/meteora_fee_router.json", "w") as f:
-            json.dump(idl, f, indent=2)
-        
-        print("✅ Generated comprehensive IDL with {} instructions".format(len(idl["instructions"])))
-        print("📁 Saved to: target/idl/meteora_fee_router.json")
-        print("📊 File size: {} lines".format(len(json.dumps(idl, indent=2).split('\n'))))
+        idl = generate_idl(force=cli_args.force)
+        if idl is None:
+            print("✅ IDL is up to date: {}".format(IDL_PATH))
+        else:
+            # Write to target/idl directory; drop the stamp first so a failed
+            # write can never leave a matching stamp next to a partial file
+            IDL_PATH.parent.mkdir(parents=True, exist_ok=True)
+            STAMP_PATH.unlink(missing_ok=True)
+            write_idl(idl, IDL_PATH)
+            STAMP_PATH.write_text(idl_stamp())
+            
+            print("✅ Generated comprehensive IDL with {} instructions".format(len(idl["instructions"])))
+            print("📁 Saved to: {}".format(IDL_PATH))
+            print("📊 File size: {} bytes".format(IDL_PATH.stat().st_size))
         
     except Exception as e:
         print(f"❌ Error generating IDL: {e}")